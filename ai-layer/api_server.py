@@ -9,19 +9,24 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+import asyncio
+import hashlib
+import orjson
 import os
-import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import tempfile
 import uuid
 from datetime import datetime
+import aiofiles
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 from word_transcription import WordTranscriber
-from sliding_window_matcher import SlidingWindowMatcher, format_time
+from sliding_window_matcher import SlidingWindowMatcher, format_time, warm_kernels
 from speaker_verification import SpeakerVerifier
 
 # Initialize FastAPI app
@@ -45,15 +50,21 @@ TEXT_THRESHOLD = 0.80  # 80% text similarity threshold
 SPEAKER_THRESHOLD = 0.85  # 85% speaker similarity threshold
 VIDEO_DIRECTORY = "download"
 UPLOAD_DIRECTORY = "uploads"
+VERIFICATION_CACHE_DIRECTORY = "verification_cache"
 Path(UPLOAD_DIRECTORY).mkdir(exist_ok=True)
+Path(VERIFICATION_CACHE_DIRECTORY).mkdir(exist_ok=True)
 
 # Initialize services
 transcriber = WordTranscriber()
 matcher = SlidingWindowMatcher(similarity_threshold=TEXT_THRESHOLD)
 speaker_verifier = SpeakerVerifier()  # Initialize speaker verifier
+warm_kernels()  # Precompile scan kernels for common clip lengths
 
-# In-memory storage for verification results
-verification_cache: Dict[str, Dict] = {}
+# In-memory storage for verification results — bounded so long-running
+# processes don't accumulate match lists forever (dict-like API, LRU
+# eviction plus a 1-hour TTL; evicted IDs are reloaded from the
+# id_<verification_id>.json copies persisted alongside the clip cache)
+verification_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
 
 
 # Pydantic models
@@ -99,17 +110,178 @@ def cleanup_temp_file(file_path: str):
         print(f"Warning: Could not delete temp file {file_path}: {e}")
 
 
+async def save_upload(
+    file: UploadFile,
+    dest_path: str,
+    chunk_size: int = 1 << 20,
+    audio_path: Optional[str] = None
+) -> str:
+    """
+    Stream an upload to disk in chunks without blocking the event loop,
+    computing the SHA-256 of the content in the same pass.
+
+    When audio_path is given, the same chunks are also teed into ffmpeg's
+    stdin to extract mono 16kHz audio during the upload — the transcriber
+    then never has to re-read the video from disk. If ffmpeg can't handle
+    the container from a pipe (e.g. mp4 with a trailing moov atom), the
+    audio file is removed and the caller falls back to file-based
+    extraction.
+
+    Returns the hex digest of the uploaded bytes.
+    """
+    hasher = hashlib.sha256()
+
+    proc = None
+    if audio_path:
+        proc = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-i', 'pipe:0',
+            '-vn', '-c:a', 'libopus', '-b:a', '24k', '-application', 'voip',
+            '-ar', '16000', '-ac', '1',
+            '-y', audio_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+    async with aiofiles.open(dest_path, 'wb') as out:
+        while chunk := await file.read(chunk_size):
+            await out.write(chunk)
+            hasher.update(chunk)
+            if proc is not None:
+                try:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    proc = None  # ffmpeg bailed; extraction falls back to the file
+
+    if audio_path:
+        audio_ok = False
+        if proc is not None:
+            proc.stdin.close()
+            audio_ok = await proc.wait() == 0
+        if not audio_ok and os.path.exists(audio_path):
+            os.remove(audio_path)
+
+    return hasher.hexdigest()
+
+
+def load_video_transcriptions(video_files: List[Path]) -> List[Dict]:
+    """
+    Load (or create) transcriptions for all registered videos in
+    parallel. Failures are logged and skipped, preserving the order of
+    the videos that succeed.
+    """
+    def load(video_path: Path) -> Optional[Dict]:
+        try:
+            return transcriber.transcribe_with_word_timestamps(str(video_path))
+        except Exception as e:
+            print(f"Warning: Failed to transcribe {video_path.name}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return [t for t in executor.map(load, video_files) if t is not None]
+
+
+def registered_videos_digest() -> str:
+    """
+    Digest of the current registered-video set (content fingerprints).
+
+    Folded into verification cache keys so cached verdicts track the
+    video library: adding, replacing or deleting a video changes the
+    digest and retires every verdict computed against the old set —
+    a clip verified before its source video was registered gets
+    re-verified instead of serving a stale "not_verified".
+    """
+    hasher = hashlib.blake2b(digest_size=8)
+    for video_path in get_available_videos():
+        try:
+            hasher.update(
+                transcriber.content_fingerprint(str(video_path)).encode())
+        except Exception:
+            # Unreadable video: fold in the path so the digest still
+            # distinguishes this library state
+            hasher.update(str(video_path).encode())
+    return hasher.hexdigest()
+
+
+def load_cached_verification(clip_hash: str) -> Optional[Dict]:
+    """
+    Load a persisted verification result for a clip content hash.
+
+    The key includes the registered-video-set digest, so results cached
+    against a different video library are never returned.
+    """
+    cache_path = Path(VERIFICATION_CACHE_DIRECTORY) / (
+        f"{clip_hash}_{registered_videos_digest()}.json")
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except Exception as e:
+        print(f"Warning: Could not read verification cache {cache_path}: {e}")
+        return None
+
+
+def save_cached_verification(clip_hash: str, result: Dict):
+    """
+    Persist a verification result so re-uploads of the same clip are instant.
+
+    Writes two copies: one keyed by clip hash + video-set digest (clip
+    re-upload lookups) and one keyed by verification ID, so GET /verify/{id}
+    still resolves after the in-memory entry is evicted.
+    """
+    payload = orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
+    cache_dir = Path(VERIFICATION_CACHE_DIRECTORY)
+    for name in (f"{clip_hash}_{registered_videos_digest()}.json",
+                 f"id_{result['verification_id']}.json"):
+        cache_path = cache_dir / name
+        try:
+            with open(cache_path, 'wb') as f:
+                f.write(payload)
+        except Exception as e:
+            print(f"Warning: Could not write verification cache {cache_path}: {e}")
+
+
+def load_verification_by_id(verification_id: str) -> Optional[Dict]:
+    """Load a persisted verification result by its verification ID."""
+    cache_path = Path(VERIFICATION_CACHE_DIRECTORY) / f"id_{verification_id}.json"
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except Exception as e:
+        print(f"Warning: Could not read verification cache {cache_path}: {e}")
+        return None
+
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+# (directory mtime_ns, video list) — rescan only when the directory changes
+_videos_cache = (0, [])
+
+
 def get_available_videos() -> List[Path]:
-    """Get list of available videos in directory."""
+    """Get list of available videos in directory (mtime-cached)."""
+    global _videos_cache
+
     video_dir = Path(VIDEO_DIRECTORY)
     if not video_dir.exists():
         return []
-    
-    video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
-    video_files = []
-    for ext in video_extensions:
-        video_files.extend(video_dir.glob(f"*{ext}"))
-    
+
+    mtime = os.stat(VIDEO_DIRECTORY).st_mtime_ns
+    if mtime == _videos_cache[0]:
+        return _videos_cache[1]
+
+    # Single scandir pass instead of one glob per extension
+    video_files = sorted(
+        Path(entry.path)
+        for entry in os.scandir(VIDEO_DIRECTORY)
+        if entry.is_file() and Path(entry.name).suffix.lower() in VIDEO_EXTENSIONS
+    )
+
+    _videos_cache = (mtime, video_files)
     return video_files
 
 
@@ -215,16 +387,37 @@ async def verify_clip(
     
     # Save uploaded file temporarily
     temp_file_path = None
+    temp_audio_path = None
     try:
-        # Create temp file
+        # Create temp file, hashing the clip content and extracting its
+        # audio while it streams to disk — one pass over the upload bytes
         suffix = Path(file.filename).suffix
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_DIRECTORY) as temp_file:
-            temp_file_path = temp_file.name
-            shutil.copyfileobj(file.file, temp_file)
-        
-        # Step 1: Transcribe clip
+        temp_fd, temp_file_path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_DIRECTORY)
+        os.close(temp_fd)
+        temp_audio_path = temp_file_path + '.ogg'
+        clip_hash = await save_upload(file, temp_file_path, audio_path=temp_audio_path)
+
+        # A byte-identical clip was verified before: return the stored result
+        # and skip transcription and matching entirely (worker thread: disk
+        # read plus, on first call, per-video fingerprint reads for the
+        # video-set digest)
+        cached_result = await asyncio.to_thread(load_cached_verification, clip_hash)
+        if cached_result:
+            print(f"✓ Verification cache hit for clip {clip_hash[:12]}")
+            verification_cache[cached_result['verification_id']] = cached_result
+            background_tasks.add_task(cleanup_temp_file, temp_file_path)
+            background_tasks.add_task(cleanup_temp_file, temp_audio_path)
+            return VerificationResult(**cached_result)
+
+        # Step 1: Transcribe clip (reusing the audio extracted in-stream;
+        # if the pipe extraction failed, the transcriber extracts from disk).
+        # Worker thread: the Whisper round trip blocks for seconds
         try:
-            clip_transcription = transcriber.transcribe_clip(temp_file_path)
+            clip_transcription = await asyncio.to_thread(
+                transcriber.transcribe_clip,
+                temp_file_path,
+                audio_path=temp_audio_path if os.path.exists(temp_audio_path) else None
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=400,
@@ -240,24 +433,21 @@ async def verify_clip(
                 detail=f"No videos found in {VIDEO_DIRECTORY}"
             )
         
-        # Step 3: Transcribe all videos (with caching)
-        video_transcriptions = []
-        for video_path in video_files:
-            try:
-                transcription = transcriber.transcribe_with_word_timestamps(str(video_path))
-                video_transcriptions.append(transcription)
-            except Exception as e:
-                print(f"Warning: Failed to transcribe {video_path.name}: {e}")
-                continue
-        
+        # Step 3: Transcribe all videos (with caching), loading them
+        # concurrently — cache hits are disk reads and cache misses are
+        # Whisper round-trips, both I/O-bound — and off the event loop
+        video_transcriptions = await asyncio.to_thread(
+            load_video_transcriptions, video_files)
+
         if not video_transcriptions:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to transcribe any videos"
             )
         
-        # Step 4: Search for matches
-        matches = matcher.search_all_videos(clip_transcription, video_transcriptions)
+        # Step 4: Search for matches (off the event loop — the scan is CPU-bound)
+        matches = await asyncio.to_thread(
+            matcher.search_all_videos, clip_transcription, video_transcriptions)
         
         # Step 5: Speaker Verification (if content match found)
         speaker_verification = None
@@ -275,15 +465,19 @@ async def verify_clip(
                 duration = end_time - start_time
                 verify_duration = min(10.0, duration)  # Analyze up to 10 seconds
                 
-                # Verify speaker
-                speaker_result = speaker_verifier.verify_speaker(
+                # Verify speaker in a worker thread: the ffmpeg extraction,
+                # model inference and (on first use) the lazy model load are
+                # all blocking and would otherwise freeze the event loop
+                speaker_result = await asyncio.to_thread(
+                    speaker_verifier.verify_speaker,
                     clip_path=temp_file_path,
                     clip_start=0,
                     clip_duration=verify_duration,
                     original_path=original_video_path,
                     original_start=start_time,
                     original_duration=verify_duration,
-                    threshold=SPEAKER_THRESHOLD
+                    threshold=SPEAKER_THRESHOLD,
+                    clip_cache_key=clip_hash
                 )
                 
                 speaker_verification = {
@@ -329,23 +523,30 @@ async def verify_clip(
             "speaker_threshold": SPEAKER_THRESHOLD
         }
         
-        # Cache result
+        # Cache result (in memory and on disk, keyed by clip content hash);
+        # the disk writes go to a worker thread like the other blocking steps
         verification_cache[verification_id] = result
+        await asyncio.to_thread(save_cached_verification, clip_hash, result)
         
-        # Schedule cleanup of temp file
+        # Schedule cleanup of temp files
         background_tasks.add_task(cleanup_temp_file, temp_file_path)
-        
+        background_tasks.add_task(cleanup_temp_file, temp_audio_path)
+
         return VerificationResult(**result)
-        
+
     except HTTPException:
         # Re-raise HTTP exceptions
         if temp_file_path:
             cleanup_temp_file(temp_file_path)
+        if temp_audio_path:
+            cleanup_temp_file(temp_audio_path)
         raise
     except Exception as e:
         # Clean up temp file on error
         if temp_file_path:
             cleanup_temp_file(temp_file_path)
+        if temp_audio_path:
+            cleanup_temp_file(temp_audio_path)
         raise HTTPException(
             status_code=500,
             detail=f"Verification failed: {str(e)}"
@@ -363,13 +564,21 @@ async def get_verification_result(verification_id: str):
     Returns:
     - Cached verification result
     """
-    if verification_id not in verification_cache:
+    result = verification_cache.get(verification_id)
+    if result is None:
+        # Evicted from the in-memory cache (TTL/LRU): fall back to the
+        # persisted copy and repopulate memory
+        result = load_verification_by_id(verification_id)
+        if result is not None:
+            verification_cache[verification_id] = result
+
+    if result is None:
         raise HTTPException(
             status_code=404,
             detail=f"Verification result not found: {verification_id}"
         )
-    
-    return verification_cache[verification_id]
+
+    return result
 
 
 @app.post("/videos/add", tags=["Videos"])
@@ -394,12 +603,11 @@ async def add_video(
     
     # Validate file extension
     suffix = Path(file.filename).suffix.lower()
-    valid_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
-    
-    if suffix not in valid_extensions:
+
+    if suffix not in VIDEO_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type. Supported: {', '.join(valid_extensions)}"
+            detail=f"Invalid file type. Supported: {', '.join(sorted(VIDEO_EXTENSIONS))}"
         )
     
     # Use provided title or filename
@@ -420,10 +628,9 @@ async def add_video(
         counter += 1
     
     try:
-        # Save uploaded file
-        with open(video_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
+        # Save uploaded file (streamed in chunks, off the event loop)
+        await save_upload(file, str(video_path))
+
         # Transcribe in background
         def transcribe_video():
             """Background task to transcribe the video."""
@@ -479,13 +686,19 @@ async def delete_video(video_name: str):
         )
     
     try:
+        # Resolve cache paths first — they're derived from the video's
+        # content fingerprint, which needs the file to still exist
+        cache_path = transcriber.get_cache_path(str(video_path))
+        sidecar_path = transcriber.get_sidecar_path(str(video_path))
+
         # Delete video file
         video_path.unlink()
-        
-        # Delete cached transcription
-        cache_path = transcriber.get_cache_path(str(video_path))
+
+        # Delete cached transcription (and its numeric sidecar)
         if cache_path.exists():
             cache_path.unlink()
+        if sidecar_path.exists():
+            sidecar_path.unlink()
         
         return {
             "status": "success",
@@ -559,7 +772,7 @@ async def clear_cache():
         }
     
     cleared_count = 0
-    for cache_file in cache_dir.glob("*.json"):
+    for cache_file in list(cache_dir.glob("*.json")) + list(cache_dir.glob("*.npz")):
         try:
             cache_file.unlink()
             cleared_count += 1
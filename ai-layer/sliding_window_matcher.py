@@ -5,9 +5,119 @@ Finds clips in videos by sliding through word sequences.
 """
 
 from typing import List, Dict, Optional
-from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+import os
 import re
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import xxhash
+from rapidfuzz import process
+from rapidfuzz.distance import Indel
+
+# Numba is optional: when available the sliding scan runs as a parallel
+# JIT-compiled token-LCS kernel; otherwise RapidFuzz scores the same
+# token windows with Indel similarity, which is the identical metric
+# (2·LCS / (len(clip) + len(window))).
+try:
+    from numba import njit, prange
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+
+def encode_token_ids(words: List[str]) -> np.ndarray:
+    """
+    Encode words as uint32 token IDs via a stateless hash.
+
+    Stateless hashing means IDs computed at transcription time (and stored
+    in the cache sidecar) match IDs computed for a clip at request time —
+    no shared vocabulary to maintain or persist. xxhash3 is branch-free and
+    collision odds at 32 bits are negligible for equality counting over
+    typical vocabularies.
+
+    Args:
+        words: List of words
+
+    Returns:
+        np.uint32 array of token IDs
+    """
+    return np.fromiter(
+        (xxhash.xxh3_64_intdigest(word.encode()) & 0xFFFFFFFF for word in words),
+        dtype=np.uint32,
+        count=len(words)
+    )
+
+
+# Kernels specialized per clip word count (see _window_kernel); clip
+# lengths cluster tightly in practice, so only a handful ever compile
+_kernel_cache: Dict[int, object] = {}
+
+# Clip word counts worth precompiling before the first request arrives
+COMMON_CLIP_WORD_COUNTS = (10, 20, 50, 100)
+
+
+def _window_kernel(k: int):
+    """
+    Get (or compile) the window-scoring kernel specialized for clip word
+    count k.
+
+    Baking k into the kernel as a closure constant lets Numba fully unroll
+    the inner match loop; the compiled function is cached so each observed
+    clip length pays compilation once.
+
+    Args:
+        k: Clip word count (window size)
+
+    Returns:
+        Compiled kernel (video_ids, clip_ids, candidates) ->
+        (best_start_index, best_similarity)
+    """
+    kernel = _kernel_cache.get(k)
+    if kernel is not None:
+        return kernel
+
+    @njit(parallel=True)
+    def _best_window_at(video_ids, clip_ids, candidates):
+        n = candidates.shape[0]
+        scores = np.zeros(n, dtype=np.float64)
+        for i in prange(n):
+            start = candidates[i]
+            # Two-row LCS between clip and window tokens. Unlike a
+            # position-wise equality count, LCS tolerates the word
+            # insertions/deletions Whisper routinely produces when it
+            # transcribes the clip and the source independently.
+            prev = np.zeros(k + 1, dtype=np.int32)
+            curr = np.zeros(k + 1, dtype=np.int32)
+            for j in range(k):
+                token = video_ids[start + j]
+                for m in range(k):
+                    if token == clip_ids[m]:
+                        curr[m + 1] = prev[m] + 1
+                    elif curr[m] >= prev[m + 1]:
+                        curr[m + 1] = curr[m]
+                    else:
+                        curr[m + 1] = prev[m + 1]
+                prev, curr = curr, prev
+            # Indel similarity with equal lengths: 2*LCS / (k + k)
+            scores[i] = prev[k] / k
+        best = int(np.argmax(scores))
+        return candidates[best], scores[best]
+
+    # Warm the specialization so its first real call doesn't pay compilation
+    _best_window_at(np.zeros(k + 1, dtype=np.uint32), np.zeros(k, dtype=np.uint32),
+                    np.zeros(1, dtype=np.int64))
+
+    _kernel_cache[k] = _best_window_at
+    return _best_window_at
+
+
+def warm_kernels(sizes=COMMON_CLIP_WORD_COUNTS):
+    """Precompile the window kernels for common clip lengths (no-op without numba)."""
+    if _NUMBA_AVAILABLE:
+        for k in sizes:
+            _window_kernel(k)
+
 
 class SlidingWindowMatcher:
     """
@@ -15,27 +125,35 @@ class SlidingWindowMatcher:
     Maps matching positions back to word-level timestamps.
     """
     
-    def __init__(self, similarity_threshold: float = 0.85):
+    # How many candidate windows to score per batch before checking whether
+    # the early-accept threshold was already reached
+    CANDIDATE_BATCH_SIZE = 64
+
+    # Cap on memoized (clip, video) match results
+    MATCH_CACHE_MAX = 4096
+
+    def __init__(self, similarity_threshold: float = 0.85,
+                 fast_accept_threshold: float = 0.99):
         """
         Initialize matcher.
-        
+
         Args:
             similarity_threshold: Minimum similarity (0.0-1.0) to consider a match
+            fast_accept_threshold: Similarity at which the scan stops early —
+                a near-perfect window can't be meaningfully beaten
         """
         self.similarity_threshold = similarity_threshold
-    
-    def calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """
-        Calculate similarity between two text strings using SequenceMatcher.
-        
-        Args:
-            text1: First text (normalized)
-            text2: Second text (normalized)
-            
-        Returns:
-            Similarity score (0.0 to 1.0)
-        """
-        return SequenceMatcher(None, text1, text2).ratio()
+        self.fast_accept_threshold = fast_accept_threshold
+
+        # Per-video parsed data (word list, token IDs, word-position index,
+        # char offsets) keyed by video_path, so repeated verification
+        # requests don't re-tokenize the library.
+        self._video_index_cache: Dict[str, Dict] = {}
+
+        # Memoized match results keyed by (clip text hash, video, video
+        # length) — retried verifications of the same clip against the same
+        # library become dict lookups.
+        self._match_cache: Dict[tuple, Optional[Dict]] = {}
     
     def split_into_words(self, text: str) -> List[str]:
         """
@@ -48,7 +166,235 @@ class SlidingWindowMatcher:
             List of words
         """
         return text.split()
-    
+
+    def get_video_index(self, video_transcription: Dict) -> Dict:
+        """
+        Get (or build and cache) the parsed/tokenized index for a video.
+
+        The index is built once per video and reused across all subsequent
+        clip verifications:
+            {
+                'words': List[str],
+                'token_ids': np.uint32 array,
+                'positions': Dict[word, List[int]],
+                'text': str (space-joined words),
+                'offsets': np.int64 char offsets,
+                'text_len': int (staleness check)
+            }
+
+        Args:
+            video_transcription: Video transcription dict
+
+        Returns:
+            Index dict as described above
+        """
+        key = video_transcription.get('video_path') or video_transcription.get('video_name')
+        text = video_transcription['normalized_text']
+
+        if key:
+            index = self._video_index_cache.get(key)
+            if index is not None and index['text_len'] == len(text):
+                return index
+
+        words = self.split_into_words(text)
+
+        # Positions of every word in the video, built in one pass
+        positions: Dict[str, List[int]] = {}
+        for idx, word in enumerate(words):
+            positions.setdefault(word, []).append(idx)
+
+        # Prefer precomputed token IDs from the transcription cache sidecar
+        token_ids = video_transcription.get('token_ids')
+        if token_ids is None or len(token_ids) != len(words):
+            token_ids = encode_token_ids(words)
+        else:
+            token_ids = np.asarray(token_ids, dtype=np.uint32)
+
+        index = {
+            'words': words,
+            'token_ids': token_ids,
+            'positions': positions,
+            'text': ' '.join(words),
+            'offsets': self.word_char_offsets(words),
+            'text_len': len(text)
+        }
+
+        if key:
+            self._video_index_cache[key] = index
+
+        return index
+
+    def _match_cache_key(
+        self,
+        clip_text: str,
+        video_transcription: Dict
+    ) -> Optional[tuple]:
+        """
+        Build the memoization key for a (clip, video) match, or None when
+        the video has no stable identity to key on.
+
+        The key is (clip text hash, video path, video text length); the
+        length guards against a re-transcribed video serving stale results.
+
+        Args:
+            clip_text: Space-joined clip words
+            video_transcription: Video transcription dict
+
+        Returns:
+            Hashable cache key or None
+        """
+        video_key = video_transcription.get('video_path') or video_transcription.get('video_name')
+        if not video_key:
+            return None
+        return (
+            xxhash.xxh3_64_intdigest(clip_text.encode()),
+            video_key,
+            len(video_transcription['normalized_text'])
+        )
+
+    def _match_cache_put(self, key: Optional[tuple], match: Optional[Dict]):
+        """Store a match result in the memo, evicting wholesale at the cap."""
+        if key is None:
+            return
+        if len(self._match_cache) >= self.MATCH_CACHE_MAX:
+            self._match_cache.clear()
+        self._match_cache[key] = match
+
+    def candidate_positions(
+        self,
+        clip_words: List[str],
+        positions: Dict[str, List[int]],
+        video_word_count: int
+    ) -> Optional[np.ndarray]:
+        """
+        Prefilter window start positions using the rarest clip word.
+
+        Instead of scoring every window, locate occurrences of the clip word
+        that is rarest in the video and only score windows aligned to them
+        (Horspool/Sunday-style: cheap skip, expensive verify on survivors).
+
+        Args:
+            clip_words: Words from the clip
+            positions: Word-position index of the video (from get_video_index)
+            video_word_count: Number of words in the video
+
+        Returns:
+            Sorted int64 array of candidate start indices, or None when no
+            clip word occurs in the video (caller should fall back to a
+            full scan)
+        """
+        clip_word_count = len(clip_words)
+
+        # Rarest clip word that actually occurs in the video
+        rare_offset = -1
+        rare_count = 0
+        for offset, word in enumerate(clip_words):
+            hits = positions.get(word)
+            if hits and (rare_offset < 0 or len(hits) < rare_count):
+                rare_offset = offset
+                rare_count = len(hits)
+
+        if rare_offset < 0:
+            return None
+
+        # Candidate window starts aligned so the rare word lines up
+        candidates = sorted({
+            pos - rare_offset
+            for pos in positions[clip_words[rare_offset]]
+            if 0 <= pos - rare_offset <= video_word_count - clip_word_count
+        })
+
+        if not candidates:
+            return None
+
+        return np.asarray(candidates, dtype=np.int64)
+
+    def word_char_offsets(self, words: List[str]) -> np.ndarray:
+        """
+        Compute character offsets of each word within the space-joined text.
+
+        Args:
+            words: List of words
+
+        Returns:
+            int64 array of length len(words) + 1 where entry i is the
+            character position of word i in ' '.join(words) (the final
+            entry is one past the end of the text)
+        """
+        lengths = np.fromiter((len(w) + 1 for w in words), dtype=np.int64, count=len(words))
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return offsets
+
+    def _find_exact(self, clip_text: str, video_index: Dict) -> Optional[int]:
+        """
+        Check whether the clip text occurs verbatim in the video text.
+
+        CPython's str.find is a heavily optimized substring search, so an
+        exact hit costs O(V + K) and skips the sliding scan entirely.
+
+        Args:
+            clip_text: Space-joined clip words
+            video_index: Video index from get_video_index
+
+        Returns:
+            Start word index of the exact occurrence, or None
+        """
+        video_text = video_index['text']
+
+        pos = video_text.find(clip_text)
+        while pos != -1:
+            # Only accept hits aligned to word boundaries
+            start_ok = pos == 0 or video_text[pos - 1] == ' '
+            end = pos + len(clip_text)
+            end_ok = end == len(video_text) or video_text[end] == ' '
+            if start_ok and end_ok:
+                # Word char offsets are exact starts, so the word index is
+                # just the position of pos in the offsets array
+                return int(np.searchsorted(video_index['offsets'], pos))
+            pos = video_text.find(clip_text, pos + 1)
+
+        return None
+
+    def _score_windows(
+        self,
+        clip_ids: np.ndarray,
+        clip_word_count: int,
+        video_index: Dict,
+        starts: np.ndarray
+    ) -> tuple:
+        """
+        Score the windows at the given start positions by token-level Indel
+        similarity (2·LCS / (clip length + window length)), which tolerates
+        the insertions and deletions independent Whisper runs produce.
+
+        Uses the Numba LCS kernel when available, otherwise one vectorized
+        RapidFuzz Indel call over the same token windows — both backends
+        compute the identical metric.
+
+        Args:
+            clip_ids: Clip token IDs
+            clip_word_count: Number of clip words
+            video_index: Video index from get_video_index
+            starts: int64 array of window start positions to score
+
+        Returns:
+            (best_start_index, best_similarity)
+        """
+        if _NUMBA_AVAILABLE:
+            position, similarity = _window_kernel(clip_word_count)(
+                video_index['token_ids'], clip_ids, starts)
+            return int(position), float(similarity)
+
+        # sliding_window_view is a strided view (no copy); indexing it with
+        # the candidate starts gathers just the windows to score
+        windows = sliding_window_view(video_index['token_ids'], clip_word_count)
+        scores = process.cdist(
+            [clip_ids], windows[starts],
+            scorer=Indel.normalized_similarity, workers=-1)[0]
+        best = int(np.argmax(scores))
+        return int(starts[best]), float(scores[best])
+
     def find_best_match(
         self,
         clip_transcription: Dict,
@@ -75,60 +421,118 @@ class SlidingWindowMatcher:
             or None if no match found
         """
         clip_words = self.split_into_words(clip_transcription['normalized_text'])
-        video_words = self.split_into_words(video_transcription['normalized_text'])
-        
+        clip_text = ' '.join(clip_words)
+
+        # Retried verifications of the same clip are a dict lookup
+        memo_key = self._match_cache_key(clip_text, video_transcription)
+        if memo_key is not None and memo_key in self._match_cache:
+            return self._match_cache[memo_key]
+
+        video_index = self.get_video_index(video_transcription)
+        video_words = video_index['words']
+
         clip_word_count = len(clip_words)
         video_word_count = len(video_words)
-        
+
         if clip_word_count == 0 or video_word_count == 0:
             return None
-        
+
         if clip_word_count > video_word_count:
             # Clip is longer than video, can't match
             return None
-        
-        # Sliding window search
-        best_match = None
-        best_similarity = 0.0
-        best_position = -1
-        
-        # Slide through video, extracting windows of clip length
-        for start_idx in range(video_word_count - clip_word_count + 1):
-            end_idx = start_idx + clip_word_count
-            
-            # Extract window
-            window_words = video_words[start_idx:end_idx]
-            window_text = ' '.join(window_words)
-            clip_text = ' '.join(clip_words)
-            
-            # Calculate similarity
-            similarity = self.calculate_text_similarity(clip_text, window_text)
-            
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_position = start_idx
-        
+
+        # Fast path: a verbatim occurrence is a perfect match — no scan needed
+        exact_position = self._find_exact(clip_text, video_index)
+        if exact_position is not None:
+            match = self._build_match(
+                clip_word_count, exact_position, 1.0,
+                video_transcription, video_index)
+            self._match_cache_put(memo_key, match)
+            return match
+
+        # Sliding window search.
+        # Prefilter: only score windows aligned to the rarest clip word
+        candidates = self.candidate_positions(
+            clip_words, video_index['positions'], video_word_count)
+
+        clip_ids = encode_token_ids(clip_words)
+
+        if candidates is None:
+            # Full scan: score every window in one call
+            starts = np.arange(video_word_count - clip_word_count + 1, dtype=np.int64)
+            best_position, best_similarity = self._score_windows(
+                clip_ids, clip_word_count, video_index, starts)
+        else:
+            # The prefilter usually puts the true match among the first few
+            # candidates — score in batches and stop once a near-perfect
+            # window is found instead of scanning every survivor
+            best_position = -1
+            best_similarity = 0.0
+            for batch_start in range(0, len(candidates), self.CANDIDATE_BATCH_SIZE):
+                batch = candidates[batch_start:batch_start + self.CANDIDATE_BATCH_SIZE]
+                position, similarity = self._score_windows(
+                    clip_ids, clip_word_count, video_index, batch)
+                if similarity > best_similarity:
+                    best_position = position
+                    best_similarity = similarity
+                if best_similarity >= self.fast_accept_threshold:
+                    break
+
+        match = self._build_match(
+            clip_word_count, best_position, best_similarity,
+            video_transcription, video_index)
+        self._match_cache_put(memo_key, match)
+        return match
+
+    def _build_match(
+        self,
+        clip_word_count: int,
+        best_position: int,
+        best_similarity: float,
+        video_transcription: Dict,
+        video_index: Dict
+    ) -> Optional[Dict]:
+        """
+        Build the match result dict for a scored window position.
+
+        Args:
+            clip_word_count: Number of clip words
+            best_position: Best window start word index
+            best_similarity: Best window similarity
+            video_transcription: Video transcription dict
+            video_index: Video index from get_video_index
+
+        Returns:
+            Match dict, or None when below threshold or out of range
+        """
         # Check if best match exceeds threshold
         if best_similarity < self.similarity_threshold:
             return None
-        
+
         # Map word position to timestamp
         start_word_index = best_position
         end_word_index = best_position + clip_word_count - 1
-        
-        # Get timestamps from video's word list
-        video_word_list = video_transcription['words']
-        
-        if start_word_index >= len(video_word_list) or end_word_index >= len(video_word_list):
-            return None
-        
-        start_time = video_word_list[start_word_index]['start']
-        end_time = video_word_list[end_word_index]['end']
-        
+
+        # Prefer the SoA timestamp arrays (direct float32 indexing); fall
+        # back to the per-word dict list for transcriptions without them
+        word_starts = video_transcription.get('word_starts')
+        word_ends = video_transcription.get('word_ends')
+        if word_starts is not None and end_word_index < len(word_starts):
+            start_time = float(word_starts[start_word_index])
+            end_time = float(word_ends[end_word_index])
+        else:
+            video_word_list = video_transcription['words']
+
+            if start_word_index >= len(video_word_list) or end_word_index >= len(video_word_list):
+                return None
+
+            start_time = video_word_list[start_word_index]['start']
+            end_time = video_word_list[end_word_index]['end']
+
         # Get matched text for display
-        matched_words = video_words[start_word_index:end_word_index + 1]
+        matched_words = video_index['words'][start_word_index:end_word_index + 1]
         matched_text = ' '.join(matched_words)
-        
+
         return {
             'video_path': video_transcription['video_path'],
             'video_name': video_transcription['video_name'],
@@ -141,7 +545,7 @@ class SlidingWindowMatcher:
             'clip_word_count': clip_word_count,
             'duration': end_time - start_time
         }
-    
+
     def search_all_videos(
         self,
         clip_transcription: Dict,
@@ -158,16 +562,26 @@ class SlidingWindowMatcher:
             List of matches sorted by similarity (highest first)
         """
         matches = []
-        
+
         print(f"\nSearching clip in {len(video_transcriptions)} videos...")
         print(f"Clip: {len(clip_transcription.get('words', []))} words")
         print()
-        
-        for i, video_trans in enumerate(video_transcriptions, 1):
-            print(f"  [{i}/{len(video_transcriptions)}] Searching in {video_trans['video_name']}...")
-            
-            match = self.find_best_match(clip_transcription, video_trans)
-            
+
+        # Each video scan is independent, so run them in parallel. Both
+        # scorer backends (numba LCS kernel and RapidFuzz Indel) release
+        # the GIL for the bulk of the work, so threads scale — and both
+        # compute the same token Indel similarity, so verdicts don't
+        # depend on whether numba imported.
+        max_workers = min(len(video_transcriptions), os.cpu_count() or 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda video_trans: self.find_best_match(clip_transcription, video_trans),
+                video_transcriptions
+            ))
+
+        for i, (video_trans, match) in enumerate(zip(video_transcriptions, results), 1):
+            print(f"  [{i}/{len(video_transcriptions)}] Searched {video_trans['video_name']}")
+
             if match:
                 matches.append(match)
                 print(f"    ✓ Match found: {match['similarity']:.1%} at {match['start_time']:.1f}s")
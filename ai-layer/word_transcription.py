@@ -6,15 +6,19 @@ Uses OpenAI Whisper API with word-level timestamps for precise matching.
 
 import os
 import sys
-import json
+import orjson
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from openai import OpenAI
 import subprocess
 import tempfile
 import re
 
+from sliding_window_matcher import encode_token_ids
+
 
 class WordTranscriber:
     """
@@ -23,7 +27,23 @@ class WordTranscriber:
     """
     
     CACHE_DIR = Path("transcription_cache")
-    
+
+    # Deletes ASCII punctuation in one C-level pass (keeps word chars,
+    # whitespace and underscore, matching the \w semantics of the regex
+    # fallback used for non-ASCII text)
+    _PUNCT_TABLE = str.maketrans('', '', ''.join(
+        chr(c) for c in range(128)
+        if not (chr(c).isalnum() or chr(c).isspace() or chr(c) == '_')
+    ))
+    _NON_WORD_RE = re.compile(r'[^\w\s]')
+    _WS_RE = re.compile(r'\s+')
+
+    # Long audio is split into overlapping chunks transcribed in parallel;
+    # anything up to two chunks long isn't worth the stitching overhead
+    CHUNK_SECONDS = 60.0
+    CHUNK_OVERLAP = 2.0
+    MAX_CHUNK_WORKERS = 4
+
     def __init__(self, api_key: str = None):
         """
         Initialize transcriber with OpenAI API key.
@@ -36,24 +56,83 @@ class WordTranscriber:
             raise ValueError("OpenAI API key required. Set OPENAI_API_KEY or pass api_key parameter.")
         
         self.client = OpenAI(api_key=self.api_key)
-        
+
         # Create cache directory
         self.CACHE_DIR.mkdir(exist_ok=True)
-    
+
+        # Fingerprints memoized per (path, mtime, size) so repeated cache
+        # path lookups don't re-read the file head/tail
+        self._fingerprint_cache: Dict[tuple, str] = {}
+
+        # ffprobe durations memoized the same way
+        self._duration_cache: Dict[tuple, float] = {}
+
+    # How much of the file head and tail goes into the fingerprint
+    _FINGERPRINT_CHUNK = 1 << 20
+
+    def content_fingerprint(self, video_path: str) -> str:
+        """
+        Cheap content hash of a video: blake2b over the first and last 1MB
+        plus the file size.
+
+        Keying the transcription cache on content instead of path means
+        renamed/moved videos and duplicate copies share one cache entry
+        (and one Whisper bill). Hashing only the head and tail is
+        probabilistic but effectively collision-free for real video files.
+
+        Args:
+            video_path: Path to video file
+
+        Returns:
+            Hex fingerprint string
+        """
+        path = Path(video_path).absolute()
+        stat = path.stat()
+        memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        fingerprint = self._fingerprint_cache.get(memo_key)
+        if fingerprint is not None:
+            return fingerprint
+
+        hasher = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+        with open(path, 'rb') as f:
+            hasher.update(f.read(self._FINGERPRINT_CHUNK))
+            if stat.st_size > 2 * self._FINGERPRINT_CHUNK:
+                f.seek(-self._FINGERPRINT_CHUNK, os.SEEK_END)
+            hasher.update(f.read(self._FINGERPRINT_CHUNK))
+
+        fingerprint = hasher.hexdigest()
+        self._fingerprint_cache[memo_key] = fingerprint
+        return fingerprint
+
     def get_cache_path(self, video_path: str) -> Path:
         """
-        Get cache file path for a video.
-        
+        Get cache file path for a video, keyed by its content fingerprint.
+
         Args:
             video_path: Path to video file
-            
+
         Returns:
             Path to cache JSON file
         """
-        # Create hash of video path for cache filename
-        video_hash = hashlib.md5(str(Path(video_path).absolute()).encode()).hexdigest()
+        video_hash = self.content_fingerprint(video_path)
         cache_filename = f"{Path(video_path).stem}_{video_hash}.json"
         return self.CACHE_DIR / cache_filename
+
+    def get_sidecar_path(self, video_path: str) -> Path:
+        """
+        Get the numeric sidecar (.npz) path for a video's cached transcription.
+
+        The sidecar holds precomputed token IDs and word timestamps as numpy
+        arrays so the matcher can consume them without re-tokenizing.
+
+        Args:
+            video_path: Path to video file
+
+        Returns:
+            Path to sidecar .npz file
+        """
+        return self.get_cache_path(video_path).with_suffix('.npz')
     
     def load_from_cache(self, video_path: str) -> Optional[Dict]:
         """
@@ -69,14 +148,39 @@ class WordTranscriber:
         
         if cache_path.exists():
             try:
-                with open(cache_path, 'r') as f:
-                    cached = json.load(f)
+                with open(cache_path, 'rb') as f:
+                    cached = orjson.loads(f.read())
                     print(f"✓ Loaded from cache: {cache_path.name}")
-                    return cached
             except Exception as e:
                 print(f"⚠️  Cache read error: {e}")
                 return None
-        
+
+            # Attach precomputed numeric arrays from the sidecar if present,
+            # and rebuild the words list for caches written in the compact
+            # format (small JSON header + sidecar arrays)
+            sidecar_path = self.get_sidecar_path(video_path)
+            if sidecar_path.exists():
+                try:
+                    with np.load(sidecar_path) as sidecar:
+                        cached['token_ids'] = sidecar['token_ids']
+                        # SoA timestamp arrays for vectorized lookups
+                        cached['word_starts'] = sidecar['word_starts']
+                        cached['word_ends'] = sidecar['word_ends']
+                        if 'words' not in cached and 'word_texts' in sidecar:
+                            texts = str(sidecar['word_texts'])
+                            cached['words'] = [
+                                {'word': word, 'start': float(start), 'end': float(end)}
+                                for word, start, end in zip(
+                                    texts.split('\n') if texts else [],
+                                    sidecar['word_starts'],
+                                    sidecar['word_ends'])
+                            ]
+                except Exception as e:
+                    print(f"⚠️  Sidecar read error: {e}")
+
+            cached.setdefault('words', [])
+            return cached
+
         return None
     
     def save_to_cache(self, video_path: str, transcription: Dict):
@@ -88,10 +192,46 @@ class WordTranscriber:
             transcription: Transcription dict to cache
         """
         cache_path = self.get_cache_path(video_path)
-        
+        words = transcription.get('words', [])
+
+        # Sidecar with the bulky per-word data as arrays: token IDs, word
+        # texts (newline-joined) and start/end times (float32). Written
+        # first so a cache hit never sees a header without its words.
+        try:
+            np.savez(
+                self.get_sidecar_path(video_path),
+                token_ids=encode_token_ids(
+                    transcription.get('normalized_text', '').split()),
+                word_texts=np.array('\n'.join(w['word'] for w in words)),
+                word_starts=np.asarray(
+                    transcription.get('word_starts',
+                                      [w['start'] for w in words]),
+                    dtype=np.float32),
+                word_ends=np.asarray(
+                    transcription.get('word_ends',
+                                      [w['end'] for w in words]),
+                    dtype=np.float32)
+            )
+            sidecar_ok = True
+        except Exception as e:
+            print(f"⚠️  Sidecar write error: {e}")
+            sidecar_ok = False
+
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(transcription, f, indent=2)
+            # Record the content key in the payload so a (vanishingly rare)
+            # fingerprint collision is detectable against 'video_path'
+            transcription.setdefault('cache_key', self.content_fingerprint(video_path))
+            # Compact JSON header — the words list lives in the sidecar
+            # (kept inline if the sidecar write failed); numeric arrays
+            # attached to the dict are never JSON material
+            header = {
+                k: v for k, v in transcription.items()
+                if k not in ('words', 'word_starts', 'word_ends', 'token_ids')
+            }
+            if not sidecar_ok:
+                header['words'] = words
+            with open(cache_path, 'wb') as f:
+                f.write(orjson.dumps(header, option=orjson.OPT_SERIALIZE_NUMPY))
             print(f"✓ Saved to cache: {cache_path.name}")
         except Exception as e:
             print(f"⚠️  Cache write error: {e}")
@@ -106,18 +246,32 @@ class WordTranscriber:
         Returns:
             Path to extracted audio file
         """
-        temp_dir = Path("temp_audio")
+        # Prefer RAM-backed tmpfs so the intermediate audio never touches
+        # disk; fall back to a local scratch directory elsewhere
+        if os.path.isdir('/dev/shm'):
+            temp_dir = Path('/dev/shm/truchain_audio')
+        else:
+            temp_dir = Path("temp_audio")
         temp_dir.mkdir(exist_ok=True)
-        
-        # Create temp file
-        video_hash = hashlib.md5(str(Path(video_path).absolute()).encode()).hexdigest()[:8]
-        output_path = temp_dir / f"audio_{video_hash}.mp3"
-        
-        # Extract audio using ffmpeg
+
+        # Deterministic per-video name (blake2b is faster than md5 and
+        # plenty for a non-cryptographic filename): re-extractions of the
+        # same video just overwrite one scratch file, while concurrent
+        # transcriptions of different videos never collide
+        video_hash = hashlib.blake2b(
+            str(Path(video_path).absolute()).encode(), digest_size=4).hexdigest()
+        output_path = temp_dir / f"audio_{video_hash}.ogg"
+
+        # Extract audio using ffmpeg. Opus at 24kbps voip tuning is ~10x
+        # smaller than default-quality MP3 with no Whisper accuracy loss
+        # (Whisper resamples to 16kHz mono internally anyway), which cuts
+        # the upload leg of the API call dramatically
         cmd = [
             'ffmpeg', '-i', video_path,
             '-vn',  # No video
-            '-acodec', 'libmp3lame',
+            '-c:a', 'libopus',
+            '-b:a', '24k',
+            '-application', 'voip',  # Speech-optimized encoding
             '-ar', '16000',  # 16kHz sample rate
             '-ac', '1',  # Mono
             '-y', str(output_path)
@@ -141,26 +295,167 @@ class WordTranscriber:
         """
         # Lowercase
         text = text.lower()
-        
-        # Remove punctuation except spaces
-        text = re.sub(r'[^\w\s]', '', text)
-        
-        # Collapse multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Strip leading/trailing spaces
-        text = text.strip()
-        
-        return text
-    
-    def transcribe_with_word_timestamps(self, video_path: str, use_cache: bool = True) -> Dict:
+
+        # Remove punctuation except spaces — str.translate for the common
+        # all-ASCII case, precompiled regex otherwise
+        if text.isascii():
+            text = text.translate(self._PUNCT_TABLE)
+        else:
+            text = self._NON_WORD_RE.sub('', text)
+
+        # Collapse whitespace runs and strip the ends
+        return self._WS_RE.sub(' ', text).strip()
+
+    def _probe_duration(self, audio_path: str) -> float:
+        """
+        Audio duration in seconds via ffprobe (0.0 if it can't tell).
+        Memoized per (path, mtime, size) — a stat beats forking ffprobe
+        when the same file is probed again.
+        """
+        try:
+            stat = os.stat(audio_path)
+            memo_key = (audio_path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            memo_key = None
+        if memo_key is not None and memo_key in self._duration_cache:
+            return self._duration_cache[memo_key]
+
+        try:
+            proc = subprocess.run(
+                ['ffprobe', '-v', 'error',
+                 '-show_entries', 'format=duration',
+                 '-of', 'default=noprint_wrappers=1:nokey=1', audio_path],
+                capture_output=True, check=True)
+            duration = float(proc.stdout.strip())
+        except Exception:
+            duration = 0.0
+
+        if memo_key is not None:
+            self._duration_cache[memo_key] = duration
+        return duration
+
+    def _whisper_words(self, audio_path: str) -> Tuple[str, list, float, str]:
+        """
+        One Whisper API call with word-level timestamps.
+
+        Args:
+            audio_path: Path to audio file to upload
+
+        Returns:
+            (full_text, [(word, start, end), ...], duration, language)
+        """
+        with open(audio_path, 'rb') as audio_file:
+            return self._whisper_request(audio_file)
+
+    def _whisper_request(self, file) -> Tuple[str, list, float, str]:
+        """
+        Issue the Whisper API call for an open file or an in-memory
+        (name, bytes, mime) tuple and unpack the word-level response.
+        """
+        response = self.client.audio.transcriptions.create(
+            model="whisper-1",
+            file=file,
+            response_format="verbose_json",
+            timestamp_granularities=["word"]
+        )
+
+        words = [
+            (w.word, w.start, w.end)
+            for w in (getattr(response, 'words', None) or [])
+        ]
+        duration = getattr(response, 'duration', 0)
+        language = getattr(response, 'language', 'unknown')
+        return response.text, words, duration, language
+
+    def _transcribe_chunk(self, audio_path: str, index: int, start: float):
+        """
+        Extract one chunk (stream copy, no re-encode) and transcribe it.
+        The chunk is piped from ffmpeg stdout and uploaded from memory as
+        a (name, bytes, mime) tuple — no chunk files to write or clean
+        up. Runs inside the chunk worker pool, so chunk i+1's ffmpeg
+        overlaps chunk i's Whisper upload.
+        """
+        cmd = [
+            'ffmpeg', '-ss', str(start), '-i', audio_path,
+            '-t', str(self.CHUNK_SECONDS),
+            '-c:a', 'copy',
+            '-f', 'ogg',
+            'pipe:1'
+        ]
+        proc = subprocess.run(cmd, capture_output=True, check=True)
+        return self._whisper_request(
+            (f"chunk{index}.ogg", proc.stdout, "audio/ogg"))
+
+    def _transcribe_chunked(
+        self,
+        audio_path: str,
+        total_duration: float
+    ) -> Tuple[str, list, float, str]:
+        """
+        Transcribe long audio as overlapping CHUNK_SECONDS chunks in
+        parallel, then stitch the results back into one timeline.
+
+        In the 2s overlap between consecutive chunks each word appears in
+        both transcriptions; the stitcher keeps words whose (rebased)
+        start falls in the chunk's half of the overlap, so every word is
+        emitted exactly once and boundary words keep the timestamps from
+        the chunk that heard them with more context.
+
+        Args:
+            audio_path: Path to the full extracted audio
+            total_duration: Duration of the audio in seconds
+
+        Returns:
+            Same tuple shape as _whisper_words
+        """
+        step = self.CHUNK_SECONDS - self.CHUNK_OVERLAP
+        starts = [float(s) for s in np.arange(0.0, total_duration, step)]
+        # A trailing sliver inside the previous chunk's overlap adds
+        # nothing but another API call
+        if len(starts) > 1 and total_duration - starts[-1] <= self.CHUNK_OVERLAP:
+            starts.pop()
+
+        print(f"  Splitting into {len(starts)} chunks of "
+              f"{self.CHUNK_SECONDS:.0f}s ({self.CHUNK_OVERLAP:.0f}s overlap)...")
+
+        with ThreadPoolExecutor(max_workers=self.MAX_CHUNK_WORKERS) as executor:
+            results = list(executor.map(
+                lambda args: self._transcribe_chunk(audio_path, *args),
+                enumerate(starts)
+            ))
+
+        texts = []
+        words = []
+        language = results[0][3] if results else 'unknown'
+        half = self.CHUNK_OVERLAP / 2
+        for i, (start, (text, chunk_words, _, _)) in enumerate(zip(starts, results)):
+            lo = start + half if i > 0 else 0.0
+            hi = starts[i + 1] + half if i + 1 < len(starts) else float('inf')
+            kept = [
+                (w, s + start, e + start)
+                for (w, s, e) in chunk_words
+                if lo <= s + start < hi
+            ]
+            words.extend(kept)
+            texts.append(' '.join(w.strip() for (w, _, _) in kept))
+
+        return ' '.join(t for t in texts if t), words, total_duration, language
+
+    def transcribe_with_word_timestamps(
+        self,
+        video_path: str,
+        use_cache: bool = True,
+        audio_path: Optional[str] = None
+    ) -> Dict:
         """
         Transcribe video with word-level timestamps.
-        
+
         Args:
             video_path: Path to video file
             use_cache: Whether to use cached transcription if available
-            
+            audio_path: Pre-extracted audio for this video (skips the ffmpeg
+                pass; the file is removed after transcription either way)
+
         Returns:
             {
                 'video_path': str,
@@ -182,31 +477,28 @@ class WordTranscriber:
             if cached:
                 return cached
         
-        # Extract audio
-        print("  Extracting audio...")
-        audio_path = self.extract_audio(video_path)
+        # Extract audio (unless the caller already extracted it in-stream)
+        if audio_path is None:
+            print("  Extracting audio...")
+            audio_path = self.extract_audio(video_path)
         
         try:
-            # Transcribe with word-level timestamps
-            print("  Calling Whisper API (word-level timestamps)...")
-            
-            with open(audio_path, 'rb') as audio_file:
-                response = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="verbose_json",
-                    timestamp_granularities=["word"]
-                )
-            
-            # Extract data
-            full_text = response.text
-            words = response.words if hasattr(response, 'words') else []
-            duration = response.duration if hasattr(response, 'duration') else 0
-            language = response.language if hasattr(response, 'language') else 'unknown'
-            
+            # Transcribe with word-level timestamps. Long audio goes
+            # through the chunked pipeline so ffmpeg extraction and
+            # Whisper uploads overlap; short audio isn't worth stitching.
+            total_duration = self._probe_duration(audio_path)
+            if total_duration > self.CHUNK_SECONDS * 2:
+                print("  Calling Whisper API (chunked, word-level timestamps)...")
+                full_text, words, duration, language = self._transcribe_chunked(
+                    audio_path, total_duration)
+            else:
+                print("  Calling Whisper API (word-level timestamps)...")
+                full_text, words, duration, language = self._whisper_words(
+                    audio_path)
+
             # Normalize text
             normalized_text = self.normalize_text(full_text)
-            
+
             # Create result
             result = {
                 'video_path': str(Path(video_path).absolute()),
@@ -215,17 +507,24 @@ class WordTranscriber:
                 'normalized_text': normalized_text,
                 'words': [
                     {
-                        'word': w.word,
-                        'start': w.start,
-                        'end': w.end
+                        'word': word,
+                        'start': start,
+                        'end': end
                     }
-                    for w in words
+                    for word, start, end in words
                 ],
                 'duration': duration,
                 'language': language,
                 'word_count': len(words)
             }
-            
+
+            # SoA timestamp arrays alongside the dict list — downstream
+            # timestamp lookups index these instead of iterating dicts
+            result['word_starts'] = np.asarray(
+                [start for _, start, _ in words], dtype=np.float32)
+            result['word_ends'] = np.asarray(
+                [end for _, _, end in words], dtype=np.float32)
+
             print(f"  ✓ Transcribed: {len(words)} words, {duration:.1f}s duration")
             
             # Save to cache
@@ -241,17 +540,40 @@ class WordTranscriber:
             except:
                 pass
     
-    def transcribe_clip(self, clip_path: str) -> Dict:
+    def transcribe_clip(self, clip_path: str, audio_path: Optional[str] = None) -> Dict:
         """
         Transcribe a user-submitted clip (no caching for clips).
-        
+
         Args:
             clip_path: Path to clip file
-            
+            audio_path: Pre-extracted audio for the clip, if available
+
         Returns:
             Transcription dict with word-level timestamps
         """
-        return self.transcribe_with_word_timestamps(clip_path, use_cache=False)
+        return self.transcribe_with_word_timestamps(
+            clip_path, use_cache=False, audio_path=audio_path)
+
+    def transcribe_pair(self, clip_path: str, video_path: str) -> Tuple[Dict, Dict]:
+        """
+        Transcribe a clip and an original video concurrently.
+
+        The two Whisper round-trips are independent, so running them in a
+        two-worker pool roughly halves wall time when both miss the cache
+        (the audio extraction overlaps too); cache hits return immediately.
+
+        Args:
+            clip_path: Path to clip file (never cached)
+            video_path: Path to original video (cached)
+
+        Returns:
+            (clip transcription, video transcription)
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            clip_future = executor.submit(self.transcribe_clip, clip_path)
+            video_future = executor.submit(
+                self.transcribe_with_word_timestamps, video_path)
+            return clip_future.result(), video_future.result()
 
 
 def main():